@@ -5,10 +5,18 @@
 ############################################
 
 from dataclasses import dataclass, field
+from enum import IntEnum
 from typing import Any, Optional, Union
 
 
-@dataclass
+class ItemType(IntEnum):
+    """What a PlaylistItem's clipIndex refers to."""
+
+    PATTERN = 0  # a Pattern
+    CHANNEL = 1  # an audio clip or automation clip Channel
+
+
+@dataclass(slots=True)
 class PlaylistItem:
     start: int  # position in playlist, in ticks
     length: int  # length of item, in ticks
@@ -17,7 +25,7 @@ class PlaylistItem:
     clipEnd: int  # position in the Pattern wehre this clip ends, in ticks. # TODO isn't this always clipStart+length
     muted: bool  # is this clip muted?
     selected: bool  # is this clip currently selected in the playlist?
-    itemType: str  # type of tis clip. allowed values are 'pattern', 'channel' (audio clip or automation)
+    itemType: ItemType  # pattern or channel (audio clip or automation)
     # TODO make PatternItem, AutomationClipItem, AudioClipItem subclasses when doing 21.0 support, so they can have extra parameters
     clipIndex: int  # index of this item's Pattern or Audio CLip/Automation Clip generator, depending on its type.
 
@@ -27,7 +35,7 @@ class PlaylistItem:
     # TODO should this class have a reference to the Pattern/AudioClip/AutomationClip generator object?
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaylistArrangement:
     name: Optional[str] = None  # if none, show as 'Arrangement i' etc (I think)
     items: list[PlaylistItem] = field(default_factory=list)
@@ -38,7 +46,7 @@ class PlaylistArrangement:
     Keys are Event names, values are either ints or bytes depending on event type."""
 
 
-@dataclass
+@dataclass(slots=True)
 class Pattern:
     name: Optional[str] = None  # if none, show as 'Pattern i' etc (I think)
 
@@ -47,7 +55,7 @@ class Pattern:
     Keys are Event names, values are either ints or bytes depending on event type."""
 
 
-@dataclass
+@dataclass(slots=True)
 class Channel:
     """Object representing a Generator (synth, audioclip, automation clip etc)"""
 
@@ -65,7 +73,7 @@ class Channel:
     # TODO expand misc (muted, FLP_ChanParams)
 
 
-@dataclass
+@dataclass(slots=True)
 class ArrangementTrack:
     """Object representing a track (row) in the arrangement."""
 
@@ -78,7 +86,7 @@ class ArrangementTrack:
     # TODO decode TrackInfo event (is it a child, is it muted, etc.)
 
 
-@dataclass
+@dataclass(slots=True)
 class MixerEffect:
     """Object representing a mixer track in the Mixer."""
 
@@ -90,7 +98,7 @@ class MixerEffect:
     Keys are Event names, values are either ints or bytes depending on event type."""
 
 
-@dataclass
+@dataclass(slots=True)
 class MixerTrack:
     """Object representing a mixer track in the Mixer."""
 
@@ -104,7 +112,7 @@ class MixerTrack:
     Keys are Event names, values are either ints or bytes depending on event type."""
 
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     """Object representing an FL Studio project (.flp file)."""
 
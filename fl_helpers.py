@@ -4,26 +4,31 @@
 # Part of the FLPX project
 ############################################
 
+from typing import Callable
+
 from _types import *
 
 
 def pattern_i_name(project, i: int) -> str:
     if i >= len(project.patterns):  # ghost pattern
         return "Pattern {} (ghost)".format(i + 1)
-    elif "FLP_Text_PatName" in project.patterns[i]:
-        return project.patterns[i]["FLP_Text_PatName"].decode("UTF-16-LE")
+    elif project.patterns[i].name:
+        return project.patterns[i].name
     else:
         return "Pattern {}".format(i + 1)
 
 
 def channel_i_name(project, i: int) -> str:
-    return project.channels[i]["name"]
+    return project.channels[i].name
+
+
+UNSHIFTED_CLIP_START = 3212836864
 
 
 def normalise_clip_start(s: int) -> int:
     """If a playlist item has never been shifted, the starting tick is
     inexplicably written as 3212836864 - map this to 0."""
-    return s if s != 3212836864 else 0
+    return s if s != UNSHIFTED_CLIP_START else 0
 
 
 DEFAULT_BEATDIV = 96
@@ -31,26 +36,24 @@ DEFAULT_BLOCKLENGTH = 4
 DEFAULT_PATLENGTH = 4
 
 
-def ticks_to_BST(project: Project, ticks: int) -> str:
-    numerator = (
-        project.projectInfo["FLP_PatLength"]
-        if "FLP_PatLength" in project.projectInfo
-        else DEFAULT_PATLENGTH
-    )
-    denominator = (
-        project.projectInfo["FLP_BlockLength"]
-        if "FLP_BlockLength" in project.projectInfo
-        else DEFAULT_BLOCKLENGTH
-    )
-    timebase = (
-        project.projectInfo["NBeatDiv"]
-        if "NBeatDiv" in project.projectInfo
-        else DEFAULT_BEATDIV
-    )
+def ticks_to_BST_converter(project: Project) -> Callable[[int], str]:
+    """Return a function converting ticks to 'bar:step:tick' strings for this
+    project. Use this instead of ticks_to_BST when converting many positions."""
+    info = project.projectInfo
+    numerator = info.get("FLP_PatLength", DEFAULT_PATLENGTH)
+    denominator = info.get("FLP_BlockLength", DEFAULT_BLOCKLENGTH)
+    timebase = info.get("NBeatDiv", DEFAULT_BEATDIV)
     ticksPerStep = timebase // 4
     stepsPerBar = numerator * (16 // denominator)
-    bar = ticks // (stepsPerBar * ticksPerStep) + 1
-    step = (ticks // ticksPerStep) % stepsPerBar + 1
-    tick = ticks % ticksPerStep
+    ticksPerBar = stepsPerBar * ticksPerStep
 
-    return "{}:{:02d}:{:02d}".format(bar, step, tick)
+    def convert(ticks: int) -> str:
+        bar, ticksInBar = divmod(ticks, ticksPerBar)
+        step, tick = divmod(ticksInBar, ticksPerStep)
+        return "{}:{:02d}:{:02d}".format(bar + 1, step + 1, tick)
+
+    return convert
+
+
+def ticks_to_BST(project: Project, ticks: int) -> str:
+    return ticks_to_BST_converter(project)(ticks)
@@ -5,21 +5,26 @@
 ############################################
 
 
-from typing import Any, Callable, Optional
-from flp_read import loadFLP
+from typing import Callable, Iterator, Optional
+from flp_read import load_FLP
 import sys
 import fl_helpers
-from collections import defaultdict
+from fl_helpers import normalise_clip_start
+from dataclasses import dataclass
+from functools import cache
 
+from _types import *
 
+
+@dataclass(slots=True)
 class ArrangementChange:
     state: str  # 'added|deleted|modified|moved' (modified takes priority over moved)
     index: Optional[int] = None
-    data: Optional[dict[str, Any]] = None
+    data: Optional[PlaylistItem] = None
 
 
 def diff_arrangement(
-    arr1: dict[str, Any], arr2: dict[str, Any]
+    arr1: PlaylistArrangement, arr2: PlaylistArrangement
 ) -> list[ArrangementChange]:
     """Returns information about the differences between two versions of an
     arrangement.
@@ -39,130 +44,129 @@ def diff_arrangement(
     }s
     TODO consider making 'muted/unmuted' a state type rather than just modified?
     """
+    return [
+        ArrangementChange(state=state, index=index, data=data)
+        for state, index, data in _diff_items(arr1.items, arr2.items)
+    ]
 
-    items2Dict = defaultdict(list)  # keyed on clipID and start time.
-    # values are arrays of hits (bc same clip can be on same tick multiple times)
 
-    for item in arr2["items"]:
-        key = (item["type"], item["clipIndex"], item["start"])
-        items2Dict[key].append(item)
+def _diff_items(
+    items1: list[PlaylistItem], items2: list[PlaylistItem]
+) -> Iterator[tuple[str, Optional[int], Optional[PlaylistItem]]]:
+    """The core of diff_arrangement. Yields a (state, index, data) tuple for
+    each change, without building ArrangementChange objects."""
+    normalise = normalise_clip_start  # (local lookups are faster in the loop below)
+
+    items2Dict = {}  # keyed on clipID and start time.
+    # values are arrays of hits (bc same clip can be on same tick multiple times)
+    # (a hash join is used rather than sorting both sides and merging: in python,
+    # sorting one item list by key alone takes ~2.5x as long as building this dict)
 
-    changes = []
+    for item in items2:
+        key = (item.itemType, item.clipIndex, item.start)
+        items2Dict.setdefault(key, []).append(item)
 
-    for i in range(len(arr1["items"])):
-        item = arr1["items"][i]
-        key = (item["type"], item["clipIndex"], item["start"])
+    for i, item in enumerate(items1):
+        matches = items2Dict.get((item.itemType, item.clipIndex, item.start))
 
-        if key in items2Dict:
-            matches = items2Dict[key]
-            if len(matches) > 1:
+        if matches:  # (may be empty if every hit has already been matched)
+            # remove the match so it's no longer 'added'
+            if len(matches) == 1:
+                match = matches.pop()
+            else:
                 # find the closest one in y coordinates(for more accurate linking)
-                dists = [abs(item["track"] - i2["track"]) for i2 in matches]
+                dists = [abs(item.track - i2.track) for i2 in matches]
                 matchI = dists.index(min(dists))
-            else:
-                matchI = 0
-            match = matches[matchI]
-
-            del items2Dict[key][matchI]  # so it's no longer 'added'
+                match = matches[matchI]
+                # (swap with the last hit and pop. this reorders the hits, so ties in
+                # distance are resolved arbitrarily rather than by original position)
+                matches[matchI] = matches[-1]
+                matches.pop()
 
             # now determine if it's changed
             # (we already checked start, type, index. leaves length, track, clip start,end, status)
-            clipStartA = fl_helpers.normalise_clip_start(item["clipStart"])
-            clipStartB = fl_helpers.normalise_clip_start(match["clipStart"])
-
-            hasMoved = item["track"] != match["track"]
+            # cheapest comparisons first; clip starts only need normalising if they differ
+            hasMoved = item.track != match.track
             isModified = (
-                item["length"] != match["length"]
-                or clipStartA
-                != clipStartB  # i dont think clipEnd can change while clipStart/length stay the same
-                or item["muted"] != match["muted"]
+                item.length != match.length
+                or item.muted != match.muted
+                or (
+                    item.clipStart != match.clipStart
+                    and normalise(item.clipStart) != normalise(match.clipStart)
+                )  # i dont think clipEnd can change while clipStart/length stay the same
             )
             if isModified or hasMoved:
-                changes.append(
-                    ArrangementChange(
-                        state="modified" if isModified else "moved",
-                        index=i,
-                        data=match,
-                    )
-                )
+                yield ("modified" if isModified else "moved", i, match)
         else:  # item doesn't appear in arr2
-            changes.append(
-                ArrangementChange(
-                    state="deleted",
-                    index=i,
-                )
-            )
+            yield ("deleted", i, None)
 
     # add remaining arr2 items as added
     for items in items2Dict.values():
         for item in items:  # remember the dict contains lists!
-            changes.append(ArrangementChange(state="added", data=item))
-
-    return changes
+            yield ("added", None, item)
 
 
 def debug_describe_arrangement_diff_verbose(
     project, arrangement, changes: list[ArrangementChange]
 ):
+    ticks_to_BST = fl_helpers.ticks_to_BST_converter(project)
+
+    @cache
+    def itemName(itemType: ItemType, clipIndex: int) -> str:
+        if itemType is ItemType.PATTERN:
+            return fl_helpers.pattern_i_name(project, clipIndex)
+        else:
+            return fl_helpers.channel_i_name(project, clipIndex)
+
     for change in changes:
         # TODO handle ghost patterns
-        if "index" in change:
-            item = arrangement["items"][change.index]
-            name = (
-                fl_helpers.getNameOfPattern(project, item["clipIndex"])
-                if item["type"] == "pattern"
-                else fl_helpers.channel_i_name(project, item["clipIndex"])
-            )
-        elif "data" in change:
-            name = (
-                fl_helpers.getNameOfPattern(project, change.data["clipIndex"])
-                if change.data["type"] == "pattern"
-                else fl_helpers.channel_i_name(project, change.data["clipIndex"])
-            )
+        if change.index is not None:
+            item = arrangement.items[change.index]
+            name = itemName(item.itemType, item.clipIndex)
+        elif change.data is not None:
+            name = itemName(change.data.itemType, change.data.clipIndex)
 
         if change.state == "added":
-            print(
-                "{} added at {}".format(
-                    name, fl_helpers.ticks_to_BST(project, change.data["start"])
-                )
-            )
+            print("{} added at {}".format(name, ticks_to_BST(change.data.start)))
         elif change.state == "deleted":
-            print(
-                "{} at {} deleted".format(
-                    name, fl_helpers.ticks_to_BST(project, item["start"])
-                )
-            )
+            print("{} at {} deleted".format(name, ticks_to_BST(item.start)))
             pass
         elif change.state == "modified":
-            print(
-                "{} at {} modified".format(
-                    name, fl_helpers.ticks_to_BST(project, change.data["start"])
-                )
-            )
+            print("{} at {} modified".format(name, ticks_to_BST(change.data.start)))
         elif change.state == "moved":
             print(
                 "{} at {} moved from track {} to track {}".format(
                     name,
-                    fl_helpers.ticks_to_BST(project, item["start"]),
-                    item["track"],
-                    change.data["track"],
+                    ticks_to_BST(item.start),
+                    item.track,
+                    change.data.track,
                 )
             )
 
 
-def debug_describe_arrangement_diff_summary(arrangement, changes):
+def diff_arrangement_counts(
+    arr1: PlaylistArrangement, arr2: PlaylistArrangement
+) -> tuple[int, int, int, int]:
+    """Returns the number of (added, deleted, modified, moved) items between two
+    versions of an arrangement, without building a list of changes.
+    See diff_arrangement."""
     numAdded = numDeleted = numModified = numMoved = 0
-    numItems = len(arrangement["items"])
-    print(numItems)
-    for change in changes:
-        if change.state == "added":
+    for state, _, _ in _diff_items(arr1.items, arr2.items):
+        if state == "added":
             numAdded += 1
-        elif change.state == "deleted":
+        elif state == "deleted":
             numDeleted += 1
-        elif change.state == "modified":
+        elif state == "modified":
             numModified += 1
-        elif change.state == "moved":
+        elif state == "moved":
             numMoved += 1
+    return numAdded, numDeleted, numModified, numMoved
+
+
+def debug_describe_arrangement_diff_summary(arr1, arr2):
+    numAdded, numDeleted, numModified, numMoved = diff_arrangement_counts(arr1, arr2)
+    numItems = len(arr1.items)
+    print(numItems)
     print("{} clips ({}%) added".format(numAdded, round((numAdded / numItems * 100))))
     print(
         "{} clips ({}%) deleted".format(
@@ -177,114 +181,112 @@ def debug_describe_arrangement_diff_summary(arrangement, changes):
     print("{} clips ({}%) moved".format(numMoved, round((numMoved / numItems * 100))))
 
 
-def resolve_conflict_default(
-    arrangement, changeA: ArrangementChange, changeB: ArrangementChange
-) -> list[dict[str, Any]]:
-    """Resolve two conflicting actions, without user interaction."""
+# conflict resolution actions for resolve_conflict_default.
+# all take (arrangement, changeA, changeB) and return the items to keep
 
-    # table of what actions to take based on which conflicts
-    actionTable = {
-        "added": {
-            "added": "maybeAddBoth",
-            "deleted": "error",
-            "modified": "error",
-            "moved": "error",
-        },
-        "deleted": {
-            "added": "error",
-            "deleted": "delete",
-            "modified": "delete",  # TODO is this always wanted?
-            "moved": "delete",  # ^
-        },
-        "modified": {
-            "added": "error",
-            "deleted": "delete",
-            "modified": "twoModify",
-            "moved": "maybeMoveAndModify",
-        },
-        "moved": {
-            "added": "error",
-            "deleted": "delete",
-            "modified": "maybeMoveAndModify",
-            "moved": "A",
-        },
-    }
-    action = actionTable[changeA.state][changeB.state]
-
-    if action == "error":
-        raise Exception("invalid item change comparison")
-    elif action == "delete":
-        return []
-    elif action == "maybeAddBoth":
-        # if clips are identical, add only one, otherwise add both
-        # (start/clipID already checked)
-        itemA = changeA.data
-        itemB = changeB.data
-        clipsIdentical = (itemA["length"] == itemB["length"]) and (
-            fl_helpers.normalise_clip_start(itemA["clipStart"])
-            == fl_helpers.normalise_clip_start(itemB["clipStart"])
-        )
-        if clipsIdentical:
-            return [itemA]
-        else:
-            return [itemA, itemB]  # TODO make this configurable (ie add both or prompt)
-    elif action == "A":
-        return [changeA.data]
-    elif action == "maybeMoveAndModify":
-        # if the modify doesn't move the clip, apply both and move it
-        theMove = changeA if changeA.state == "moved" else changeB
-        theModify = changeA if changeA.state == "modified" else changeB
-        theOriginal = arrangement["items"][theModify["index"]]
-
-        if theModify["data"]["track"] == theOriginal["track"]:
-            # apply the move to the modified version
-            theModify["data"]["track"] = theMove["data"]["track"]
-        # (if both have moved, just use theModify)
-        return [theModify["data"]]
-    elif action == "twoModify":
-        theOriginal = arrangement["items"][changeA.index]
-        # merge the changes into changeA
-        # attributes that may have changed
-        clipAttribs = [
-            "start",
-            "length",
-            "track",
-            "clipStart",
-            "clipEnd",
-            "muted",
-            "selected",
-        ]
-
-        def handleClipAttrib(attrib):
-            orig = theOriginal[attrib]
-            a = changeA.data[attrib]
-            b = changeB.data[attrib]
-            aChanged = a == orig
-            bChanged = b == orig
-            if a == b:
-                return  # both versions have the same attrib; do nothing
-            elif aChanged and bChanged:
-                # UH OH both clips have been changed in a non-mergeable way. just use A's attrib for now
-                return [changeA.data]
-            elif bChanged:
-                # B changed and A didn't; replace A's attrib
-                changeA.data[attrib] = b
-            else:
-                return  # only A changed, do nothing
 
-        for attrib in clipAttribs:
-            handleClipAttrib(attrib)
-        return [changeA.data]
+def _act_error(arrangement, changeA, changeB):
+    raise Exception("invalid item change comparison")
+
+
+def _act_delete(arrangement, changeA, changeB):
+    return []
+
+
+def _act_maybeAddBoth(arrangement, changeA, changeB):
+    # if clips are identical, add only one, otherwise add both
+    # (start/clipID already checked)
+    itemA = changeA.data
+    itemB = changeB.data
+    clipsIdentical = (itemA.length == itemB.length) and (
+        normalise_clip_start(itemA.clipStart) == normalise_clip_start(itemB.clipStart)
+    )
+    if clipsIdentical:
+        return [itemA]
+    else:
+        return [itemA, itemB]  # TODO make this configurable (ie add both or prompt)
+
+
+def _act_A(arrangement, changeA, changeB):
+    return [changeA.data]
+
+
+def _act_maybeMoveAndModify(arrangement, changeA, changeB):
+    # if the modify doesn't move the clip, apply both and move it
+    theMove = changeA if changeA.state == "moved" else changeB
+    theModify = changeA if changeA.state == "modified" else changeB
+    theOriginal = arrangement.items[theModify.index]
+
+    if theModify.data.track == theOriginal.track:
+        # apply the move to the modified version
+        theModify.data.track = theMove.data.track
+    # (if both have moved, just use theModify)
+    return [theModify.data]
+
+
+def _act_twoModify(arrangement, changeA, changeB):
+    # merge B's changes into changeA: for each attribute that A left unchanged,
+    # take B's value. if both changed an attribute differently, A's value wins
+    # (for now)
+    orig = arrangement.items[changeA.index]
+    itemA = changeA.data
+    itemB = changeB.data
+    if itemA.start == orig.start:
+        itemA.start = itemB.start
+    if itemA.length == orig.length:
+        itemA.length = itemB.length
+    if itemA.track == orig.track:
+        itemA.track = itemB.track
+    if itemA.clipStart == orig.clipStart:
+        itemA.clipStart = itemB.clipStart
+    if itemA.clipEnd == orig.clipEnd:
+        itemA.clipEnd = itemB.clipEnd
+    if itemA.muted == orig.muted:
+        itemA.muted = itemB.muted
+    if itemA.selected == orig.selected:
+        itemA.selected = itemB.selected
+    return [itemA]
+
+
+# table of what actions to take based on which conflicts, keyed on (stateA, stateB)
+_ACTION_TABLE = {
+    ("added", "added"): _act_maybeAddBoth,
+    ("added", "deleted"): _act_error,
+    ("added", "modified"): _act_error,
+    ("added", "moved"): _act_error,
+    ("deleted", "added"): _act_error,
+    ("deleted", "deleted"): _act_delete,
+    ("deleted", "modified"): _act_delete,  # TODO is this always wanted?
+    ("deleted", "moved"): _act_delete,  # ^
+    ("modified", "added"): _act_error,
+    ("modified", "deleted"): _act_delete,
+    ("modified", "modified"): _act_twoModify,
+    ("modified", "moved"): _act_maybeMoveAndModify,
+    ("moved", "added"): _act_error,
+    ("moved", "deleted"): _act_delete,
+    ("moved", "modified"): _act_maybeMoveAndModify,
+    ("moved", "moved"): _act_A,
+}
+
+
+def resolve_conflict_default(
+    arrangement: PlaylistArrangement,
+    changeA: ArrangementChange,
+    changeB: ArrangementChange,
+) -> list[PlaylistItem]:
+    """Resolve two conflicting actions, without user interaction."""
+    return _ACTION_TABLE[(changeA.state, changeB.state)](arrangement, changeA, changeB)
 
 
 def merge_arrangement_changes(
-    arrangement: dict[str, Any],
+    arrangement: PlaylistArrangement,
     changesA: list[ArrangementChange],
     changesB: list[ArrangementChange],
     resolveConflict: Callable[
-        [ArrangementChange, ArrangementChange], list[dict[str, Any]]
+        [PlaylistArrangement, ArrangementChange, ArrangementChange],
+        list[PlaylistItem],
     ],
-) -> dict[str, Any]:
+) -> PlaylistArrangement:
     """Returns a new arrangement incorporating both sets of changes.
     Does ??? upon merge conflicts
     Limitations:
@@ -293,57 +295,66 @@ def merge_arrangement_changes(
       resolveConflict :: (Change, Change) => [PlaylistItem]
     """
 
-    # annotate arrangement with changesA
+    # annotate arrangement with changesA, in a list parallel to arrangement.items
     # (also collect added clips)
-    addedA = defaultdict(list)
+    numItems = len(arrangement.items)
+    changesByIndex: list[Optional[ArrangementChange]] = [None] * numItems
+    # 1 if the item has been replaced by a conflict resolution
+    deleted = bytearray(numItems)
+    addedA = {}
     for change in changesA:
         if change.state == "added":
-            item = change.data
-            key = (item["type"], item["clipIndex"], item["start"])
-            addedA[key].append(change)
+            data = change.data
+            key = (data.itemType, data.clipIndex, data.start)
+            addedA.setdefault(key, []).append(change)
         else:
-            arrangement["items"][change.index]["change"] = change
+            changesByIndex[change.index] = change
 
     # loop over changesB, look for conflicts
     newItems = []
     for change in changesB:
         if change.state == "added":
-            item = change.data
-            key = (item["type"], item["clipIndex"], item["start"])
-            if key in addedA:
+            data = change.data
+            hitsA = addedA.get((data.itemType, data.clipIndex, data.start))
+            if hitsA:
                 # if new item is identical (same start pl start/length, startPos)
-                newItems += resolveConflict(arrangement, addedA[key][0], change)
-                del addedA[key][0]
-                pass
+                newItems.extend(resolveConflict(arrangement, hitsA.pop(0), change))
             else:
-                newItems.append(item)
+                newItems.append(change.data)
         else:
-            # if the item has already been changed, use the precedence table
-            if "change" in arrangement["items"][change.index]:
-                newItems += resolveConflict(
-                    arrangement, arrangement["items"][change.index]["change"], change
-                )
-                arrangement["items"][change.index]["deleted"] = True
+            changeA = changesByIndex[change.index]
+            if changeA is not None:
+                # the item has already been changed, use the precedence table
+                newItems.extend(resolveConflict(arrangement, changeA, change))
+                deleted[change.index] = 1
+            else:
+                # only B changed this item
+                changesByIndex[change.index] = change
 
     # finally loop over the arrangement and apply pending changes
-    for item in arrangement["items"]:
-        if "deleted" in item:
+    for i, item in enumerate(arrangement.items):
+        if deleted[i]:
             continue
-        if "change" in item:
-            if item["change"]["state"] == "deleted":
+        change = changesByIndex[i]
+        if change is not None:
+            if change.state == "deleted":
                 continue
             else:
                 # state is moved or modified - just replace with the new data
-                newItems.append(item["change"]["data"])
+                newItems.append(change.data)
         else:  # item is unchanged
             newItems.append(item)
     # add new items from A and B
-    newItems += [change.data for changes in addedA.values() for change in changes]
-
-    return {
-        "items": newItems,
-        "tracks": arrangement["tracks"],  # TODO actually merge tracks
-    }
+    for changes in addedA.values():
+        for change in changes:
+            newItems.append(change.data)
+
+    return PlaylistArrangement(
+        name=arrangement.name,
+        items=newItems,
+        tracks=arrangement.tracks,  # TODO actually merge tracks
+        misc=arrangement.misc,
+    )
 
 
 if __name__ == "__main__":
@@ -353,16 +364,16 @@ if __name__ == "__main__":
     # project2 = loadFLP(file2)
     # changes = diff_arrangement(project1['arrangements'][0], project2['arrangements'][0])
     # debug_describe_arrangement_diff_verbose(project1, project1['arrangements'][0], changes)
-    # debug_describe_arrangement_diff_summary(project1['arrangements'][0], changes)
+    # debug_describe_arrangement_diff_summary(project1['arrangements'][0], project2['arrangements'][0])
 
     # usage: python flp_diff.py [...] original.flp edited_a.flp edited_b.flp
-    projO = loadFLP(sys.argv[-3])
-    projA = loadFLP(sys.argv[-2])
-    projB = loadFLP(sys.argv[-1])
-    changesA = diff_arrangement(projO["arrangements"][0], projA["arrangements"][0])
-    changesB = diff_arrangement(projO["arrangements"][0], projB["arrangements"][0])
+    projO = load_FLP(sys.argv[-3])
+    projA = load_FLP(sys.argv[-2])
+    projB = load_FLP(sys.argv[-1])
+    changesA = diff_arrangement(projO.arrangements[0], projA.arrangements[0])
+    changesB = diff_arrangement(projO.arrangements[0], projB.arrangements[0])
     print("======")
-    print(len(projO["arrangements"][0]["items"]))
+    print(len(projO.arrangements[0].items))
     print("======")
 
     # for c in changesA:
@@ -370,8 +381,8 @@ if __name__ == "__main__":
     # for c in changesB:
     #   if 'index' in c: print(c['index'])
     newArrangement = merge_arrangement_changes(
-        projO["arrangements"][0], changesA, changesB, resolve_conflict_default
+        projO.arrangements[0], changesA, changesB, resolve_conflict_default
     )
 
-    for item in newArrangement["items"]:
+    for item in newArrangement.items:
         print(item)
@@ -5,8 +5,12 @@
 ############################################
 
 import hashlib
+import mmap
+import os
+import struct
 import sys
 from dataclasses import dataclass, field
+from typing import Optional, Union
 
 from _types import *
 import fl_helpers
@@ -24,6 +28,16 @@ HASH_VALUES = "-hashvalues" in sys.argv
 HEADERCHUNKID = b"FLhd"
 DATACHUNKID = b"FLdt"
 
+# header chunk ID, header length, format, nChannels, beatDiv, data chunk ID, data length
+HEADER_STRUCT = struct.Struct("<4sIHHH4sI")
+# start, misc_4_6, itemId, length, track, misc, clipStart, clipEnd
+PLAYLIST_ITEM_STRUCT = struct.Struct("<I2sHII8sII")
+WORD_STRUCT = struct.Struct("<H")
+DWORD_STRUCT = struct.Struct("<I")
+# size of each event's contents in bytes, indexed by event ID.
+# 0 for TEXT events, whose size is encoded before their contents
+EVENT_SIZES = bytes([1] * 64 + [2] * 64 + [4] * 64 + [0] * 64)
+
 
 # UTIL FUNCTIONS
 def error(msg):
@@ -39,77 +53,76 @@ def btoi(bytes):
     return int.from_bytes(bytes, "little")
 
 
-# https://stackoverflow.com/a/15365026/6560491
-def _length_of_file(f):
-    currentPos = f.tell()
-    f.seek(0, 2)  # move to end of file
-    length = f.tell()  # get current position
-    f.seek(currentPos, 0)  # go back to where we started
-    return length
-
-
-def _bytes_until_end(f, fileLength):
-    return fileLength - f.tell()
-
-
 # PARSING FUNCTIONS
 
 
-def _read_TEXT_event_size(f):
-    """Parse the size of a TEXT event, using gol's funky encoding"""
-    eventSize = 0
-    continueReading = True
-    shiftAmnt = 0
-    while continueReading:
-        byte = btoi(f.read(1))
-        eventSize += (byte & 127) << shiftAmnt
-        continueReading = (byte & 128) == 128
+def _read_TEXT_event_size(buf, pos: int) -> tuple[int, int]:
+    """Parse the size of a TEXT event starting at buf[pos], using gol's funky encoding.
+    Returns the size, and the position of the first byte after it."""
+    # (7 bits per byte, least significant first, top bit set on all but the last byte)
+    byte = buf[pos]
+    if byte < 128:  # most events are under 128 bytes long
+        return byte, pos + 1
+
+    eventSize = byte & 127
+    shiftAmnt = 7
+    pos += 1
+    while True:
+        byte = buf[pos]
+        pos += 1
+        eventSize |= (byte & 127) << shiftAmnt
+        if byte < 128:
+            return eventSize, pos
         shiftAmnt += 7
-    # print(eventSize)
-    return eventSize
-
-
-def _event_size(eventId, f):
-    """Return the size of this event in bytes."""
-    if eventId < 64:
-        return 1
-    elif eventId < 128:
-        return 2
-    elif eventId < 192:
-        return 4
-    else:
-        return _read_TEXT_event_size(f)
 
 
-def _decode_playlist_item(itemData: bytes) -> PlaylistItem:
-    """Decode binary data for a single item in a playlist/arrangement."""
+def _decode_playlist_items(data) -> list[PlaylistItem]:
+    """Decode binary data (bytes or a view) for all items in a playlist/arrangement."""
     # Notes:
     #   20-24 is always b'@d\x80\x80'
     #  ^(should i make warnings for these?)
     #   suspect they're something to do with performance mode (out of scope for now)
 
-    itemId = btoi(itemData[6:8])  # the identifier for this item
-    if itemId > 20480:
-        itemType = "pattern"
-        clipIndex = itemId - 20481
-    else:
-        # item is instead defined by the index of the audio clip/automation clip in the Channel list
-        itemType = "channel"
-        clipIndex = itemId
-
-    return PlaylistItem(
-        start=btoi(itemData[0:4]),  # position in playlist, in ticks
-        length=btoi(itemData[8:12]),
-        track=500 - btoi(itemData[12:16]),  # ie y position
-        clipStart=btoi(itemData[24:28]),  # start of the clip, in ticks
-        clipEnd=btoi(itemData[28:32]),
-        misc=itemData[16:24],  # contains muted bit, probs other stuff
-        misc_4_6=itemData[4:6],
-        muted=itemData[19] & 32 != 0,
-        selected=itemData[19] & 128 != 0,
-        itemType=itemType,
-        clipIndex=clipIndex,
-    )
+    trailingBytes = len(data) % PLAYLIST_ITEM_STRUCT.size
+    if trailingBytes:
+        data = data[:-trailingBytes]
+
+    items = []
+    for (
+        start,
+        misc_4_6,
+        itemId,  # the identifier for this item
+        length,
+        track,
+        misc,  # contains muted bit, probs other stuff
+        clipStart,
+        clipEnd,
+    ) in PLAYLIST_ITEM_STRUCT.iter_unpack(data):
+        if itemId > 20480:
+            itemType = ItemType.PATTERN
+            clipIndex = itemId - 20481
+        else:
+            # item is instead defined by the index of the audio clip/automation clip in the Channel list
+            itemType = ItemType.CHANNEL
+            clipIndex = itemId
+        flags = misc[3]  # muted (bit 5) and selected (bit 7)
+
+        items.append(
+            PlaylistItem(
+                start=start,  # position in playlist, in ticks
+                length=length,
+                track=500 - track,  # ie y position
+                clipStart=clipStart,  # start of the clip, in ticks
+                clipEnd=clipEnd,
+                misc=misc,
+                misc_4_6=misc_4_6,
+                muted=flags & 32 != 0,
+                selected=flags & 128 != 0,
+                itemType=itemType,
+                clipIndex=clipIndex,
+            )
+        )
+    return items
 
 
 EID_NAMES = {
@@ -235,12 +248,13 @@ EID_NAMES = {
 
 ENAME_IDS = {v: k for k, v in EID_NAMES.items()}
 
+# names of every possible event ID (including unknown ones), indexed by ID.
+# interned, as they end up as keys of the misc dicts
+EVENT_NAMES = [sys.intern(EID_NAMES.get(id, f"UNKNOWN_{id}")) for id in range(256)]
+
 
 def eid_to_ename(id: int) -> str:
-    if id in EID_NAMES:
-        return EID_NAMES[id]
-    else:
-        return "UNKNOWN_" + str(id)
+    return EVENT_NAMES[id]
 
 
 def ename_to_eid(event_name: str) -> int:
@@ -253,7 +267,7 @@ def ename_to_eid(event_name: str) -> int:
 # STATEFUL FILE PARSER
 
 
-@dataclass
+@dataclass(slots=True)
 class ParserContext:
     currentArrangement: int = -1
     currentArrangementTrack: int = -1
@@ -264,6 +278,10 @@ class ParserContext:
     automationClipDatas: list[bytes] = field(default_factory=list)
     isMixerEffect: bool = False
     project: Project = field(default_factory=Project)
+    # the objects the current* indices point at, so handlers don't re-index
+    channel: Optional[Channel] = None
+    pattern: Optional[Pattern] = None
+    arrangement: Optional[PlaylistArrangement] = None
 
 
 def _default_project_info():
@@ -275,300 +293,371 @@ def _default_project_info():
     }
 
 
-def _handle_flp_event(ctx: ParserContext, eventId: int, contents: bytes):
+CHANNEL_TYPE_MAP = {
+    0: "sampler",
+    2: "generator",
+    4: "audio_clip",
+    5: "automation_clip",
+}
+
+
+# EVENT HANDLERS
+# all take the parser context, the event's name and its contents (int or bytes)
+
+
+def _genericProject(ctx: ParserContext, eventName: str, contents):
+    ctx.project.projectInfo[eventName] = contents
+
+
+def _genericProjectAppend(ctx: ParserContext, eventName: str, contents):
     project = ctx.project
-    eventName = eid_to_ename(eventId)
+    if eventName not in project.projectInfo:
+        project.projectInfo[eventName] = []
+    project.projectInfo[eventName].append(contents)
 
-    # convert numeric events into ints, otherwise leave as bytes
-    if eventId < 192:
-        contents = btoi(contents)
 
-    if DEBUG:
-        fd.write(f"{eventId} {eid_to_ename(eventId)}\n{contents}\n")
+def _genericChannel(ctx: ParserContext, eventName: str, contents):
+    ctx.channel.misc[eventName] = contents
 
-    # event handlers
 
-    def genericProject():
-        project.projectInfo[eventName] = contents
+def _genericChannelAppend(ctx: ParserContext, eventName: str, contents):
+    misc = ctx.channel.misc
+    if eventName not in misc:
+        misc[eventName] = []
+    misc[eventName].append(contents)
 
-    def genericProjectAppend():
-        if eventName not in project.projectInfo:
-            project.projectInfo[eventName] = []
-        project.projectInfo[eventName].append(contents)
 
-    def genericChannel():
-        project.channels[ctx.currentChannel].misc[eventName] = contents
+def _genericArrangement(ctx: ParserContext, eventName: str, contents):
+    ctx.arrangement.misc[eventName] = contents
 
-    def genericChannelAppend():
-        if eventName not in project.channels[ctx.currentChannel].misc:
-            project.channels[ctx.currentChannel].misc[eventName] = []
-        project.channels[ctx.currentChannel].misc[eventName].append(contents)
 
-    def genericArrangement():
-        project.arrangements[ctx.currentArrangement].misc[eventName] = contents
+def _genericPattern(ctx: ParserContext, eventName: str, contents):
+    ctx.pattern.misc[eventName] = contents
 
-    def genericPattern():
-        project.patterns[ctx.currentPattern].misc[eventName] = contents
 
-    def genericMixerTrack():
-        project.mixerTracks[ctx.currentMixerTrack].misc[eventName] = contents
+def _genericMixerTrack(ctx: ParserContext, eventName: str, contents):
+    ctx.project.mixerTracks[ctx.currentMixerTrack].misc[eventName] = contents
 
-    def genericMixerEffect():
-        effects = project.mixerTracks[ctx.currentMixerTrack].effects
-        if ctx.currentMixerTrackEffectSlot not in effects:
-            effects[ctx.currentMixerTrackEffectSlot] = MixerEffect()
-        if eventName in effects[ctx.currentMixerTrackEffectSlot].misc:
-            ctx.currentMixerTrackEffectSlot += 1
-            effects[ctx.currentMixerTrackEffectSlot] = MixerEffect()
 
-        effects[ctx.currentMixerTrackEffectSlot].misc[eventName] = contents
+def _genericMixerEffect(ctx: ParserContext, eventName: str, contents):
+    effects = ctx.project.mixerTracks[ctx.currentMixerTrack].effects
+    if ctx.currentMixerTrackEffectSlot not in effects:
+        effects[ctx.currentMixerTrackEffectSlot] = MixerEffect()
+    if eventName in effects[ctx.currentMixerTrackEffectSlot].misc:
+        ctx.currentMixerTrackEffectSlot += 1
+        effects[ctx.currentMixerTrackEffectSlot] = MixerEffect()
 
-    def genericChannelOrMixerEffect():
-        if ctx.isMixerEffect:
-            genericMixerEffect()
-        else:
-            genericChannel()
+    effects[ctx.currentMixerTrackEffectSlot].misc[eventName] = contents
 
-    def patternName():
-        project.patterns[ctx.currentPattern].name = contents.decode("UTF-16-LE")
 
-    def channelName():
-        if ctx.isMixerEffect:
-            project.mixerTracks[ctx.currentMixerTrack].effects[
-                ctx.currentMixerTrackEffectSlot
-            ].name = contents.decode("UTF-16-LE")
-        else:
-            project.channels[ctx.currentChannel].name = contents.decode("UTF-16-LE")
-
-    def channelType():
-        CHANNEL_TYPE_MAP = {
-            0: "sampler",
-            2: "generator",
-            4: "audio_clip",
-            5: "automation_clip",
-        }
-        project.channels[ctx.currentChannel].type = CHANNEL_TYPE_MAP[contents]
-
-    def arrangementName():
-        project.arrangements[ctx.currentArrangement].name = contents.decode("UTF-16-LE")
-
-    def arrangementTrackName():
-        project.arrangements[ctx.currentArrangement].tracks[
-            ctx.currentArrangementTrack
+def _genericChannelOrMixerEffect(ctx: ParserContext, eventName: str, contents):
+    if ctx.isMixerEffect:
+        _genericMixerEffect(ctx, eventName, contents)
+    else:
+        _genericChannel(ctx, eventName, contents)
+
+
+def _patternName(ctx: ParserContext, eventName: str, contents):
+    ctx.pattern.name = contents.decode("UTF-16-LE")
+
+
+def _channelName(ctx: ParserContext, eventName: str, contents):
+    project = ctx.project
+    if ctx.isMixerEffect:
+        project.mixerTracks[ctx.currentMixerTrack].effects[
+            ctx.currentMixerTrackEffectSlot
         ].name = contents.decode("UTF-16-LE")
+    else:
+        ctx.channel.name = contents.decode("UTF-16-LE")
 
-    def mixerTrackName():
-        project.mixerTracks[ctx.currentMixerTrack].name = contents.decode("UTF-16-LE")
-
-    def newChannel():
-        ctx.currentChannel = contents
-        ctx.isMixerEffect = False
-        if ctx.currentChannel >= len(project.channels):
-            project.channels.append(Channel())
-
-    def newPattern():
-        index = contents - 1
-        ctx.currentPattern = index
-        if ctx.currentPattern >= len(project.patterns):
-            project.patterns.append(Pattern())
-
-    def newArrangement():
-        ctx.currentArrangement = contents
-        project.arrangements.append(PlaylistArrangement())
-
-    def newMixerTrack():
-        ctx.currentMixerTrack = len(project.mixerTracks)
-        ctx.currentMixerTrackEffectSlot = 0
-        project.mixerTracks.append(MixerTrack(misc={eventName: contents}))
-
-    def newArrangementTrack():
-        ctx.currentArrangementTrack = len(
-            project.arrangements[ctx.currentArrangement].tracks
-        )
-        project.arrangements[ctx.currentArrangement].tracks.append(
-            ArrangementTrack(misc={eventName: contents})
-        )
 
-    def newChannelFilterGroup():
-        project.channelFilterGroups.append({"name": contents.decode("UTF-16-LE")})
-
-    def parsePlaylistData():
-        bytesPerItem = 32
-        numItems = len(contents) // bytesPerItem
-        for item in range(numItems):
-            itemData = contents[item * bytesPerItem : (item + 1) * bytesPerItem]
-            item = _decode_playlist_item(itemData)
-            project.arrangements[ctx.currentArrangement].items.append(item)
-        # print(len(project.arrangements[ctx.currentArrangement].items))
-
-    def setCtxSlotIndex():
-        ctx.currentMixerTrackEffectSlot = contents
-        ctx.isMixerEffect = True
-
-    def automationClipData():
-        ctx.automationClipDatas.append(contents)
-
-    handlerLUT = {
-        # per-project
-        "FLP_ShowInfo": genericProject,
-        "FLP_Shuffle": genericProject,
-        "FLP_PatLength": genericProject,
-        "FLP_BlockLength": genericProject,
-        "FLP_CurrentPatNum": genericProject,
-        "FLP_MainPitch": genericProject,
-        "FLP_WindowH": genericProject,
-        "FLP_Text_Title": genericProject,
-        "FLP_Text_Comment": genericProject,
-        "FLP_Text_URL": genericProject,
-        "FLP_Text_CommentRTF": genericProject,
-        "FLP_Version": genericProject,
-        "IsPerformanceMode": genericProject,
-        "CurrentArrangement": genericProject,
-        "CurrentChannelFilterGroup": genericProject,
-        "Tempo": genericProject,
-        "ProjectInfoGenre": genericProject,
-        "ProjectInfoAuthor": genericProject,
-        "FLP_Version_Minor": genericProject,
-        "FLP_LoopActive": genericProject,
-        "UNKNOWN_28": genericProject,
-        "UNKNOWN_37": genericProject,
-        "UNKNOWN_200": genericProject,
-        "UNKNOWN_35": genericProject,
-        "UNKNOWN_23": genericProject,
-        "UNKNOWN_30": genericProject,
-        "UNKNOWN_202": genericProject,
-        "UNKNOWN_237": genericProject,
-        "UNKNOWN_216": genericProject,
-        "UNKNOWN_29": genericProject,
-        "UNKNOWN_39": genericProject,
-        "UNKNOWN_40": genericProject,
-        "UNKNOWN_38": genericProject,
-        "UNKNOWN_225": genericProject,
-        "UNKNOWN_226": genericProjectAppend,
-        # per-channel
-        "FLP_NewChan": newChannel,
-        "FLP_Enabled": genericChannel,
-        "FLP_LoopType": genericChannel,
-        "FLP_ChanType": channelType,
-        "FLP_MixSliceNum": genericChannel,
-        "FLP_FX": genericChannel,
-        "FLP_Text_SampleFileName": genericChannel,
-        "FLP_Fade_Stereo": genericChannel,
-        "FLP_CutOff": genericChannel,
-        "FLP_PreAmp": genericChannel,
-        "FLP_Decay": genericChannel,
-        "FLP_Attack": genericChannel,
-        "FLP_Resonance": genericChannel,
-        "FLP_StDel": genericChannel,
-        "FLP_FX3": genericChannel,
-        "FLP_ShiftDelay": genericChannel,
-        "FLP_FXSine": genericChannel,
-        "FLP_CutCutBy": genericChannel,
-        "FLP_Reverb": genericChannel,
-        "FLP_IntStretch": genericChannel,
-        "FLP_SSNote": genericChannel,
-        "FLP_Delay": genericChannel,
-        "FLP_ChanParams": genericChannel,
-        "ChannelName": channelName,
-        "ChannelEnvelopeParams": genericChannelAppend,
-        "ChannelParams": genericChannel,
-        "ChannelFilterGroup": genericChannel,
-        "UNKNOWN_32": genericChannel,
-        "UNKNOWN_97": genericChannel,
-        "UNKNOWN_143": genericChannel,
-        "UNKNOWN_144": genericChannel,
-        "UNKNOWN_221": genericChannel,
-        "UNKNOWN_229": genericChannel,
-        "UNKNOWN_228": genericChannelAppend,
-        "UNKNOWN_234": genericChannel,
-        # less confident about these, they only come up on one channel in the test file...
-        "UNKNOWN_150": genericChannel,
-        "UNKNOWN_157": genericChannel,
-        "UNKNOWN_158": genericChannel,
-        "UNKNOWN_164": genericChannel,
-        "UNKNOWN_142": genericChannel,
-        # per-pattern
-        "FLP_NewPat": newPattern,
-        "FLP_Text_PatName": patternName,
-        "PatternAutomationData": genericPattern,
-        "PatternData": genericPattern,
-        # context-aware (target changes based on position)
-        "FLP_Color": genericChannelOrMixerEffect,
-        "FLP_Text_PluginName": genericChannelOrMixerEffect,
-        "FLP_NewPlugin": genericChannelOrMixerEffect,
-        "FLP_PluginParams": genericChannelOrMixerEffect,
-        "UNKNOWN_155": genericChannelOrMixerEffect,
-        # per-mixer track
-        "MixerTrackInfo": newMixerTrack,
-        "InsertAudioOutputTarget": genericMixerTrack,
-        "InsertAudioInputSource": genericMixerTrack,
-        "InsertName": mixerTrackName,
-        "MixerTrackRouting": genericMixerTrack,
-        "MixerTrackColor": genericMixerTrack,
-        "MixerTrackIcon": genericMixerTrack,
-        # per-mixer effect
-        "SlotIndex": setCtxSlotIndex,
-        # per-arrangement
-        "ArrangementIndex": newArrangement,
-        "ArrangementName": arrangementName,
-        "PlaylistData": parsePlaylistData,
-        "UNKNOWN_36": genericArrangement,
-        # per-track-per-arrangement
-        "TrackInfo": newArrangementTrack,
-        "TrackName": arrangementTrackName,
-        # other
-        "AutomationClipData": automationClipData,
-        "ChannelFilterGroupName": newChannelFilterGroup,
-    }
+def _channelType(ctx: ParserContext, eventName: str, contents):
+    ctx.channel.type = CHANNEL_TYPE_MAP[contents]
+
 
-    if eventName not in handlerLUT:
-        warn("Missing event handler for event " + eventName)
+def _arrangementName(ctx: ParserContext, eventName: str, contents):
+    ctx.arrangement.name = contents.decode("UTF-16-LE")
+
+
+def _arrangementTrackName(ctx: ParserContext, eventName: str, contents):
+    ctx.arrangement.tracks[ctx.currentArrangementTrack].name = contents.decode(
+        "UTF-16-LE"
+    )
+
+
+def _mixerTrackName(ctx: ParserContext, eventName: str, contents):
+    ctx.project.mixerTracks[ctx.currentMixerTrack].name = contents.decode("UTF-16-LE")
+
+
+def _newChannel(ctx: ParserContext, eventName: str, contents):
+    project = ctx.project
+    ctx.currentChannel = contents
+    ctx.isMixerEffect = False
+    if ctx.currentChannel >= len(project.channels):
+        project.channels.append(Channel())
+    ctx.channel = project.channels[ctx.currentChannel]
+
+
+def _newPattern(ctx: ParserContext, eventName: str, contents):
+    project = ctx.project
+    index = contents - 1
+    ctx.currentPattern = index
+    if ctx.currentPattern >= len(project.patterns):
+        project.patterns.append(Pattern())
+    ctx.pattern = project.patterns[ctx.currentPattern]
+
+
+def _newArrangement(ctx: ParserContext, eventName: str, contents):
+    ctx.currentArrangement = contents
+    ctx.project.arrangements.append(PlaylistArrangement())
+    ctx.arrangement = ctx.project.arrangements[ctx.currentArrangement]
+
+
+def _newMixerTrack(ctx: ParserContext, eventName: str, contents):
+    project = ctx.project
+    ctx.currentMixerTrack = len(project.mixerTracks)
+    ctx.currentMixerTrackEffectSlot = 0
+    project.mixerTracks.append(MixerTrack(misc={eventName: contents}))
+
+
+def _newArrangementTrack(ctx: ParserContext, eventName: str, contents):
+    tracks = ctx.arrangement.tracks
+    ctx.currentArrangementTrack = len(tracks)
+    tracks.append(ArrangementTrack(misc={eventName: contents}))
+
+
+def _newChannelFilterGroup(ctx: ParserContext, eventName: str, contents):
+    ctx.project.channelFilterGroups.append({"name": contents.decode("UTF-16-LE")})
+
+
+def _parsePlaylistData(ctx: ParserContext, eventName: str, contents):
+    ctx.arrangement.items.extend(_decode_playlist_items(contents))
+
+
+def _setCtxSlotIndex(ctx: ParserContext, eventName: str, contents):
+    ctx.currentMixerTrackEffectSlot = contents
+    ctx.isMixerEffect = True
+
+
+def _automationClipData(ctx: ParserContext, eventName: str, contents):
+    ctx.automationClipDatas.append(contents)
+
+
+_HANDLERS_BY_NAME = {
+    # per-project
+    "FLP_ShowInfo": _genericProject,
+    "FLP_Shuffle": _genericProject,
+    "FLP_PatLength": _genericProject,
+    "FLP_BlockLength": _genericProject,
+    "FLP_CurrentPatNum": _genericProject,
+    "FLP_MainPitch": _genericProject,
+    "FLP_WindowH": _genericProject,
+    "FLP_Text_Title": _genericProject,
+    "FLP_Text_Comment": _genericProject,
+    "FLP_Text_URL": _genericProject,
+    "FLP_Text_CommentRTF": _genericProject,
+    "FLP_Version": _genericProject,
+    "IsPerformanceMode": _genericProject,
+    "CurrentArrangement": _genericProject,
+    "CurrentChannelFilterGroup": _genericProject,
+    "Tempo": _genericProject,
+    "ProjectInfoGenre": _genericProject,
+    "ProjectInfoAuthor": _genericProject,
+    "FLP_Version_Minor": _genericProject,
+    "FLP_LoopActive": _genericProject,
+    "UNKNOWN_28": _genericProject,
+    "UNKNOWN_37": _genericProject,
+    "UNKNOWN_200": _genericProject,
+    "UNKNOWN_35": _genericProject,
+    "UNKNOWN_23": _genericProject,
+    "UNKNOWN_30": _genericProject,
+    "UNKNOWN_202": _genericProject,
+    "UNKNOWN_237": _genericProject,
+    "UNKNOWN_216": _genericProject,
+    "UNKNOWN_29": _genericProject,
+    "UNKNOWN_39": _genericProject,
+    "UNKNOWN_40": _genericProject,
+    "UNKNOWN_38": _genericProject,
+    "UNKNOWN_225": _genericProject,
+    "UNKNOWN_226": _genericProjectAppend,
+    # per-channel
+    "FLP_NewChan": _newChannel,
+    "FLP_Enabled": _genericChannel,
+    "FLP_LoopType": _genericChannel,
+    "FLP_ChanType": _channelType,
+    "FLP_MixSliceNum": _genericChannel,
+    "FLP_FX": _genericChannel,
+    "FLP_Text_SampleFileName": _genericChannel,
+    "FLP_Fade_Stereo": _genericChannel,
+    "FLP_CutOff": _genericChannel,
+    "FLP_PreAmp": _genericChannel,
+    "FLP_Decay": _genericChannel,
+    "FLP_Attack": _genericChannel,
+    "FLP_Resonance": _genericChannel,
+    "FLP_StDel": _genericChannel,
+    "FLP_FX3": _genericChannel,
+    "FLP_ShiftDelay": _genericChannel,
+    "FLP_FXSine": _genericChannel,
+    "FLP_CutCutBy": _genericChannel,
+    "FLP_Reverb": _genericChannel,
+    "FLP_IntStretch": _genericChannel,
+    "FLP_SSNote": _genericChannel,
+    "FLP_Delay": _genericChannel,
+    "FLP_ChanParams": _genericChannel,
+    "ChannelName": _channelName,
+    "ChannelEnvelopeParams": _genericChannelAppend,
+    "ChannelParams": _genericChannel,
+    "ChannelFilterGroup": _genericChannel,
+    "UNKNOWN_32": _genericChannel,
+    "UNKNOWN_97": _genericChannel,
+    "UNKNOWN_143": _genericChannel,
+    "UNKNOWN_144": _genericChannel,
+    "UNKNOWN_221": _genericChannel,
+    "UNKNOWN_229": _genericChannel,
+    "UNKNOWN_228": _genericChannelAppend,
+    "UNKNOWN_234": _genericChannel,
+    # less confident about these, they only come up on one channel in the test file...
+    "UNKNOWN_150": _genericChannel,
+    "UNKNOWN_157": _genericChannel,
+    "UNKNOWN_158": _genericChannel,
+    "UNKNOWN_164": _genericChannel,
+    "UNKNOWN_142": _genericChannel,
+    # per-pattern
+    "FLP_NewPat": _newPattern,
+    "FLP_Text_PatName": _patternName,
+    "PatternAutomationData": _genericPattern,
+    "PatternData": _genericPattern,
+    # context-aware (target changes based on position)
+    "FLP_Color": _genericChannelOrMixerEffect,
+    "FLP_Text_PluginName": _genericChannelOrMixerEffect,
+    "FLP_NewPlugin": _genericChannelOrMixerEffect,
+    "FLP_PluginParams": _genericChannelOrMixerEffect,
+    "UNKNOWN_155": _genericChannelOrMixerEffect,
+    # per-mixer track
+    "MixerTrackInfo": _newMixerTrack,
+    "InsertAudioOutputTarget": _genericMixerTrack,
+    "InsertAudioInputSource": _genericMixerTrack,
+    "InsertName": _mixerTrackName,
+    "MixerTrackRouting": _genericMixerTrack,
+    "MixerTrackColor": _genericMixerTrack,
+    "MixerTrackIcon": _genericMixerTrack,
+    # per-mixer effect
+    "SlotIndex": _setCtxSlotIndex,
+    # per-arrangement
+    "ArrangementIndex": _newArrangement,
+    "ArrangementName": _arrangementName,
+    "PlaylistData": _parsePlaylistData,
+    "UNKNOWN_36": _genericArrangement,
+    # per-track-per-arrangement
+    "TrackInfo": _newArrangementTrack,
+    "TrackName": _arrangementTrackName,
+    # other
+    "AutomationClipData": _automationClipData,
+    "ChannelFilterGroupName": _newChannelFilterGroup,
+}
+
+# event handlers indexed by event ID (None where unhandled), built once at import
+_HANDLERS_BY_ID = {
+    ename_to_eid(eventName): handler for eventName, handler in _HANDLERS_BY_NAME.items()
+}
+EVENT_HANDLERS = [_HANDLERS_BY_ID.get(eventId) for eventId in range(256)]
+
+# PlaylistData is only decoded, never stored, so it's read as a view into the file
+PLAYLIST_DATA_EID = ename_to_eid("PlaylistData")
+
+
+def _handle_flp_event(ctx: ParserContext, eventId: int, contents: Union[int, bytes]):
+    if DEBUG:
+        logged = bytes(contents) if isinstance(contents, memoryview) else contents
+        fd.write(f"{eventId} {eid_to_ename(eventId)}\n{logged}\n")
+
+    handler = EVENT_HANDLERS[eventId]
+    if handler is None:
+        warn("Missing event handler for event " + eid_to_ename(eventId))
         return
 
-    if handlerLUT[eventName] != None:
-        handlerLUT[eventName]()
+    handler(ctx, eid_to_ename(eventId), contents)
 
 
 def load_FLP(filepath):
-    f = open(filepath, "rb")
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # (empty files can't be mapped; let the parser reject it as usual)
+            return _parse_FLP(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _parse_FLP(buf)
+
+
+def _parse_FLP(buf) -> Project:
+    """Parse a whole FLP file. `buf` is any bytes-like object holding the file."""
     # 'state' of the parser - e.g. which channel/arrangement/patter we're currently populating
     ctx = ParserContext()
 
-    headerChunkID = f.read(4)
-    if headerChunkID != HEADERCHUNKID:
+    if buf[0:4] != HEADERCHUNKID:
         error("This isn't an FLP file")
+    if len(buf) < HEADER_STRUCT.size:
+        error("file truncation error (header too short)")
+
+    (
+        headerChunkID,
+        headerLength,
+        headerFormat,
+        headerNChannels,  #'not really used'
+        headerBeatDiv,  # 'Pulses per quarter of the song.' (eg resolution) (mine is 96)
+        dataChunkId,
+        dataLength,  # number of remaining bytes
+    ) = HEADER_STRUCT.unpack_from(buf, 0)
 
-    headerLength = btoi(f.read(4))
     if headerLength != 6:
         error("invalid header length")
 
-    headerFormat = btoi(f.read(2))
     if headerFormat != 0:
         warn("header format not 0")
 
-    headerNChannels = btoi(f.read(2))  #'not really used'
-    headerBeatDiv = btoi(
-        f.read(2)
-    )  # 'Pulses per quarter of the song.' (eg resolution) (mine is 96)
-
-    dataChunkId = f.read(4)
     if dataChunkId != DATACHUNKID:
         error("incorrect data chunk ID")
 
-    dataLength = btoi(f.read(4))  # number of remaining bytes
-    fileLength = _length_of_file(f)
-    actualDataLength = _bytes_until_end(f, fileLength)
+    pos = HEADER_STRUCT.size
+    fileLength = len(buf)
 
-    if dataLength != actualDataLength:
+    if dataLength != fileLength - pos:
         error("file truncation error (DATA length incorrect)")
 
     # 'The whole data chunk is a succession of EVENTS'
-    while _bytes_until_end(f, fileLength) != 0:
-        eventId = btoi(f.read(1))
-        contents = f.read(_event_size(eventId, f))
-
-        _handle_flp_event(ctx, eventId, contents)
-        debug_print_flp_event(eventId, contents)
+    # (views are all released by the time we return, so `buf` can be closed)
+    with memoryview(buf) as view:
+        contents = None
+        try:
+            while pos < fileLength:
+                eventId = buf[pos]
+                pos += 1
+                # numeric events are read as ints, TEXT events are left as bytes
+                size = EVENT_SIZES[eventId]
+                if size == 1:
+                    contents = buf[pos]
+                elif size == 2:
+                    (contents,) = WORD_STRUCT.unpack_from(buf, pos)
+                elif size == 4:
+                    (contents,) = DWORD_STRUCT.unpack_from(buf, pos)
+                else:
+                    size, pos = _read_TEXT_event_size(buf, pos)
+                    if eventId == PLAYLIST_DATA_EID:
+                        # skip copying what can be hundreds of KB of item data
+                        # (the view is dropped when `contents` is next reassigned)
+                        contents = view[pos : pos + size]
+                    else:
+                        contents = buf[pos : pos + size]
+                pos += size
+
+                _handle_flp_event(ctx, eventId, contents)
+                if PRINT_EVENTS or PRINT_VALUES:
+                    debug_print_flp_event(eventId, contents)
+        except BaseException:
+            # a traceback would keep a PlaylistData view alive, stopping the
+            # caller from closing `buf` - release it so the real error shows
+            if isinstance(contents, memoryview):
+                contents.release()
+            raise
 
     # store automationclipdata on their respective channels
     for i, channel in enumerate(
@@ -580,6 +669,10 @@ def load_FLP(filepath):
 
 
 def debug_print_flp_event(eventId, contents):
+    if not (PRINT_EVENTS or PRINT_VALUES):
+        return
+    if isinstance(contents, memoryview):  # (PlaylistData)
+        contents = bytes(contents)
     if eventId not in EID_NAMES:
         # warn("Unknown Event ID " + str(eventId) + ", skipping")
         if PRINT_EVENTS:
@@ -587,7 +680,7 @@ def debug_print_flp_event(eventId, contents):
 
         if PRINT_VALUES:
             if eventId < 192:
-                print(btoi(contents))
+                print(contents)
             else:
                 if HASH_VALUES:
                     print(hashlib.md5(contents).digest().hex())
@@ -601,7 +694,7 @@ def debug_print_flp_event(eventId, contents):
             print(eventId, eventName)
         if PRINT_VALUES:
             if eventId < 192:
-                print(btoi(contents))
+                print(contents)
             else:
                 try:
                     # print(contents.decode('UTF-16-LE'))
@@ -614,9 +707,10 @@ def debug_print_flp_event(eventId, contents):
 
 
 def debug_print_main_playlist(project: Project):
+    ticks_to_BST = fl_helpers.ticks_to_BST_converter(project)
     for item in project.arrangements[0].items:
         name = ""
-        if item.itemType == "channel":
+        if item.itemType is ItemType.CHANNEL:
             name = project.channels[item.clipIndex].name
         else:  # pattern
             if item.clipIndex >= len(project.patterns):  # ghost pattern
@@ -625,11 +719,7 @@ def debug_print_main_playlist(project: Project):
                 name = project.patterns[item.clipIndex].name
             else:
                 name = "Pattern {}".format(item.clipIndex + 1)
-        print(
-            "{} at Track {}, {}".format(
-                name, item.track, fl_helpers.ticks_to_BST(project, item.start)
-            )
-        )
+        print("{} at Track {}, {}".format(name, item.track, ticks_to_BST(item.start)))
 
 
 DEBUG = 0
@@ -5,16 +5,194 @@
 ############################################
 
 
-from typing import BinaryIO, Union
-
-from flp_read import eid_to_ename, ename_to_eid
+import struct
+from functools import lru_cache
+from typing import Union
+
+from flp_read import (
+    DWORD_STRUCT,
+    EVENT_SIZES,
+    PLAYLIST_ITEM_STRUCT,
+    eid_to_ename,
+    ename_to_eid,
+)
 from _types import *
 
 
+# OPTIONS
+fd = None  # file every written event is logged to, see enable_debug()
+
 # CONSTANTS
 HEADERCHUNKID = b"FLhd"
 DATACHUNKID = b"FLdt"
 
+# everything in the header before the data length, which never changes
+HEADER_PREFIX = (
+    HEADERCHUNKID  # file header
+    + struct.pack(
+        "<IHHH",
+        6,  # header length
+        0,  # header format
+        4,  # 'not really used'
+        96,  # 'not really used'
+    )
+    + DATACHUNKID
+)
+
+# event IDs written directly by write_FLP
+NEW_PAT_EID = ename_to_eid("FLP_NewPat")
+PAT_NAME_EID = ename_to_eid("FLP_Text_PatName")
+UNKNOWN_226_EID = ename_to_eid("UNKNOWN_226")
+AUTOMATION_CLIP_DATA_EID = ename_to_eid("AutomationClipData")
+NEW_CHAN_EID = ename_to_eid("FLP_NewChan")
+CHAN_TYPE_EID = ename_to_eid("FLP_ChanType")
+PLUGIN_NAME_EID = ename_to_eid("FLP_Text_PluginName")
+NEW_PLUGIN_EID = ename_to_eid("FLP_NewPlugin")
+CHANNEL_NAME_EID = ename_to_eid("ChannelName")
+ARRANGEMENT_NAME_EID = ename_to_eid("ArrangementName")
+UNKNOWN_36_EID = ename_to_eid("UNKNOWN_36")
+TRACK_INFO_EID = ename_to_eid("TrackInfo")
+TRACK_NAME_EID = ename_to_eid("TrackName")
+MIXER_TRACK_INFO_EID = ename_to_eid("MixerTrackInfo")
+SLOT_INDEX_EID = ename_to_eid("SlotIndex")
+INSERT_NAME_EID = ename_to_eid("InsertName")
+
+# for packing numeric events (ID byte + data), indexed by data width in bytes
+EVENT_STRUCTS = [
+    None,
+    struct.Struct("<BB"),
+    struct.Struct("<BH"),
+    None,
+    struct.Struct("<BI"),
+]
+
+# SlotIndex events for each of the 10 mixer effect slots, pre-encoded
+SLOT_INDEX_EVENTS = [
+    EVENT_STRUCTS[EVENT_SIZES[SLOT_INDEX_EID]].pack(SLOT_INDEX_EID, i)
+    for i in range(10)
+]
+EMPTY_MIXER_SLOTS = b"".join(SLOT_INDEX_EVENTS)  # for tracks without effects
+
+# added to a PlaylistItem's clipIndex to get its on-disk item ID, indexed by ItemType
+# (ItemType values are 0, 1, ... so they can index a tuple)
+CLIP_ID_OFFSETS = tuple(
+    20481 if itemType is ItemType.PATTERN else 0 for itemType in ItemType
+)
+
+CHANNEL_TYPE_MAP = {
+    "sampler": 0,
+    "generator": 2,
+    "audio_clip": 4,
+    "automation_clip": 5,
+}
+
+# global project events, as (eventId, projectInfo key) groups in write order
+# (see FLP layout grammar for an explanation of these event IDs)
+PROJECT_EVENTS_START = tuple(
+    (eventId, eid_to_ename(eventId))
+    for eventId in (
+        199,
+        159,
+        28,
+        37,
+        200,
+        156,
+        67,
+        9,
+        11,
+        80,
+        17,
+        18,
+        35,
+        23,
+        30,
+        10,
+        194,
+        206,
+        207,
+        202,
+        195,
+        197,
+        237,
+    )
+)
+PROJECT_EVENTS_FILTER_GROUP = tuple(  # 146 CurrentChannelFilterGroup, 216 unknown
+    (eventId, eid_to_ename(eventId)) for eventId in (146, 216)
+)
+PROJECT_EVENTS_MIDDLE = tuple(
+    (eventId, eid_to_ename(eventId)) for eventId in (100, 29, 39, 40, 31, 38)
+)
+PROJECT_EVENTS_END = tuple(  # 225 is massive...
+    (eventId, eid_to_ename(eventId)) for eventId in (225, 133)
+)
+
+# misc events are written in this order, if present (see FLP layout grammar).
+# stored as (eventId, misc key) pairs
+PATTERN_MISC_EVENTS = tuple(
+    (ename_to_eid(key), key) for key in ("PatternAutomationData", "PatternData")
+)
+CHANNEL_MISC_EVENTS = tuple(
+    (ename_to_eid(key), key)
+    for key in (
+        "UNKNOWN_155",
+        "FLP_Color",
+        "FLP_PluginParams",
+        "FLP_Enabled",
+        "FLP_Delay",
+        "FLP_Reverb",
+        "FLP_IntStretch",
+        "FLP_ShiftDelay",
+        "UNKNOWN_97",
+        "FLP_FX",
+        "FLP_FX3",
+        "FLP_CutOff",
+        "FLP_Resonance",
+        "FLP_PreAmp",
+        "FLP_Decay",
+        "FLP_Attack",
+        "FLP_StDel",
+        "FLP_FXSine",
+        "FLP_Fade_Stereo",
+        "FLP_MixSliceNum",
+        "ChannelParams",
+        "UNKNOWN_229",
+        "UNKNOWN_221",
+        "FLP_ChanParams",
+        "FLP_CutCutBy",
+        "UNKNOWN_144",
+        "ChannelFilterGroup",
+        "UNKNOWN_234",
+        "UNKNOWN_32",
+        "UNKNOWN_228",
+        "FLP_SSNote",
+        "ChannelEnvelopeParams",
+        "UNKNOWN_143",
+        "FLP_LoopType",
+        "FLP_Text_SampleFileName",
+        "UNKNOWN_142",
+        "UNKNOWN_150",
+        "UNKNOWN_157",
+        "UNKNOWN_158",
+        "UNKNOWN_164",
+    )
+)
+MIXER_EFFECT_PRE_EVENTS = tuple(  # before the effect's name
+    (ename_to_eid(key), key) for key in ("FLP_Text_PluginName", "FLP_NewPlugin")
+)
+MIXER_EFFECT_POST_EVENTS = tuple(
+    (ename_to_eid(key), key) for key in ("UNKNOWN_155", "FLP_Color", "FLP_PluginParams")
+)
+MIXER_TRACK_MISC_EVENTS = tuple(
+    (ename_to_eid(key), key)
+    for key in (
+        "MixerTrackRouting",
+        "InsertAudioInputSource",
+        "InsertAudioOutputTarget",
+        "MixerTrackColor",
+        "MixerTrackIcon",
+    )
+)
+
 
 # UTIL FUNCTIONS
 def itob(x: int, length: int, endianness="little") -> bytes:
@@ -22,6 +200,7 @@ def itob(x: int, length: int, endianness="little") -> bytes:
     return int.to_bytes(x, length, endianness)
 
 
+@lru_cache(maxsize=4096)  # plugin/channel names repeat a lot in big projects
 def _str_to_UTF16(s: str) -> bytes:
     """Convert UTF-16-encoded strings to python strings"""
     # return codecs.utf_16_encode(str)[0] #might need to re-add a null byte?
@@ -30,277 +209,198 @@ def _str_to_UTF16(s: str) -> bytes:
 
 def _event_size_to_bytes(s: int) -> bytes:
     """Convert integer byte length to TEXT event size, using gol's funky encoding"""
-    out = b""
-    while s != 0:
-        # little endian
-        nextByte = s & 127
-        s = s >> 7
-        if s != 0:
-            # all bytes except the last one have bit 7 enabled
-            nextByte = nextByte | 128
-        out += itob(nextByte, 1)
-    return out
+    out = bytearray()
+    # little endian, 7 bits at a time
+    while s >= 128:
+        # all bytes except the last one have bit 7 enabled
+        out.append((s & 127) | 128)
+        s >>= 7
+    out.append(s)
+    return bytes(out)
 
 
-def _write_event(
-    f: BinaryIO, eventId: Union[int, str], data: Union[int, bytes]
-) -> None:
-    if isinstance(eventId, str):
-        eventId = ename_to_eid(eventId)
-    f.write(itob(eventId, 1))
+def _write_event_fast(buf: bytearray, eventId: int, data: Union[int, bytes]) -> None:
     # content is either int or bytes, depending on eventID
-    if eventId < 64:
-        f.write(itob(data, 1))
-    elif eventId < 128:
-        f.write(itob(data, 2))
-    elif eventId < 192:
-        f.write(itob(data, 4))
+    size = EVENT_SIZES[eventId]
+    if size:
+        buf.extend(EVENT_STRUCTS[size].pack(eventId, data))
     else:
+        buf.append(eventId)
         eventSize = len(data)
-        f.write(_event_size_to_bytes(eventSize))  # size of event
-        f.write(data)
-
-    if DEBUG:
-        fd.write(f"{eventId} {eid_to_ename(eventId)}\n{data}\n")
-
-
-def _make_arrangement_data(arrangement: PlaylistArrangement) -> bytes:
-    size = 32 * len(arrangement.items)
-    out = b""
-    for item in arrangement.items:
-        item_bytes = (
-            itob(item.start, 4)  # 0-4
-            + item.misc_4_6  # 4,5
-            + itob(
-                item.clipIndex + 20481
-                if item.itemType == "pattern"
-                else item.clipIndex,
-                2,
-            )  # 6,7
-            + itob(item.length, 4)  # 8-12
-            + itob(500 - item.track, 4)  # 12-16
-            + item.misc  # 16-24
-            + itob(item.clipStart, 4)  # 24-28
-            + itob(item.clipEnd, 4)  # 28-32
+        if eventSize < 128:  # most are, and then the size is a single byte
+            buf.append(eventSize)
+        else:
+            buf.extend(_event_size_to_bytes(eventSize))  # size of event
+        buf.extend(data)
+
+
+def _write_event_debug(buf: bytearray, eventId: int, data: Union[int, bytes]) -> None:
+    _write_event_fast(buf, eventId, data)
+    fd.write(f"{eventId} {eid_to_ename(eventId)}\n{data}\n")
+
+
+_write_event = _write_event_fast
+
+
+def enable_debug(logfile) -> None:
+    """Log every event written from now on to `logfile`."""
+    # (rebinding here means the normal path doesn't check a flag for every event)
+    global fd, _write_event
+    fd = logfile
+    _write_event = _write_event_debug
+
+
+def _make_arrangement_data(arrangement: PlaylistArrangement) -> bytearray:
+    recordSize = PLAYLIST_ITEM_STRUCT.size
+    pack_into = PLAYLIST_ITEM_STRUCT.pack_into
+    clipIdOffsets = CLIP_ID_OFFSETS
+    out = bytearray(recordSize * len(arrangement.items))
+    for offset, item in zip(range(0, len(out), recordSize), arrangement.items):
+        # (struct would silently pad/truncate these, so check them here)
+        assert len(item.misc_4_6) == 2 and len(item.misc) == 8
+        pack_into(
+            out,
+            offset,
+            item.start,  # 0-4
+            item.misc_4_6,  # 4,5
+            item.clipIndex + clipIdOffsets[item.itemType],  # 6,7
+            item.length,  # 8-12
+            500 - item.track,  # 12-16
+            item.misc,  # 16-24
+            item.clipStart,  # 24-28
+            item.clipEnd,  # 28-32
         )
-        assert len(item_bytes) == 32
-        out += item_bytes
         # TODO handle muted, selected members (edit .misc?)
-    assert len(out) == size
     return out
 
 
 def write_FLP(filepath: str, project: Project) -> None:
-    f = open(filepath, "wb")
-
-    # write header
-    f.write(HEADERCHUNKID)  # file header
-    f.write(itob(6, 4))  # header length
-    f.write(itob(0, 2))  # header format
-    f.write(itob(4, 2))  # 'not really used'
-    f.write(itob(96, 2))  # 'not really used'
-    f.write(DATACHUNKID)
-
-    # come back here to write dataLength here at the end
-    dataLengthPosition = f.tell()
-    f.write(b"0000")  # make space to write the size later
+    # the whole file is built up in memory, then written out in one go
+    buf = bytearray(HEADER_PREFIX)
+    buf += b"\0\0\0\0"  # data length, filled in once we know it
+    dataStart = len(buf)
 
     # write global project vars
-    def writeGenericProjectEvent(eventId):
-        name = eid_to_ename(eventId)  # the name I've given to this event
-        _write_event(f, eventId, project.projectInfo[name])
-
-    # (see FLP layout grammar for an explanation of these event IDs)
-    for eventId in [
-        199,
-        159,
-        28,
-        37,
-        200,
-        156,
-        67,
-        9,
-        11,
-        80,
-        17,
-        18,
-        35,
-        23,
-        30,
-        10,
-        194,
-        206,
-        207,
-        202,
-        195,
-        197,
-        237,
-    ]:
-        writeGenericProjectEvent(eventId)
+    projectInfo = project.projectInfo
+    for eventId, name in PROJECT_EVENTS_START:
+        _write_event(buf, eventId, projectInfo[name])
 
     # write channel group names
     for channelGroup in project.channelFilterGroups:
-        _write_event(f, 231, _str_to_UTF16(channelGroup["name"]))
+        _write_event(buf, 231, _str_to_UTF16(channelGroup["name"]))
 
-    # 146 CurrentChannelFilterGroup, 216 unknown
-    writeGenericProjectEvent(146)
-    writeGenericProjectEvent(216)
+    for eventId, name in PROJECT_EVENTS_FILTER_GROUP:
+        _write_event(buf, eventId, projectInfo[name])
 
     # write pattern data
     for i, pattern in enumerate(project.patterns):
-        _write_event(f, "FLP_NewPat", i + 1)
+        _write_event(buf, NEW_PAT_EID, i + 1)
         if pattern.name:
-            _write_event(f, "FLP_Text_PatName", _str_to_UTF16(pattern.name))
-        for miscKey in ["PatternAutomationData", "PatternData"]:
-            if miscKey in pattern.misc:
-                _write_event(f, miscKey, pattern.misc[miscKey])
+            _write_event(buf, PAT_NAME_EID, _str_to_UTF16(pattern.name))
+        for eventId, miscKey in PATTERN_MISC_EVENTS:
+            data = pattern.misc.get(miscKey)
+            if data is not None:
+                _write_event(buf, eventId, data)
 
     for data in project.projectInfo["UNKNOWN_226"]:
-        _write_event(f, "UNKNOWN_226", data)
+        _write_event(buf, UNKNOWN_226_EID, data)
 
     # write automation clip data
     for channel in project.channels:
         if channel.type == "automation_clip":
-            _write_event(f, "AutomationClipData", channel.data)
+            _write_event(buf, AUTOMATION_CLIP_DATA_EID, channel.data)
 
     # write channel data
     for i, channel in enumerate(project.channels):
-        _write_event(f, "FLP_NewChan", i)
+        _write_event(buf, NEW_CHAN_EID, i)
         # if "name" in channel: #(pretty sure this is mandatory)
 
-        CHANNEL_TYPE_MAP = {
-            "sampler": 0,
-            "generator": 2,
-            "audio_clip": 4,
-            "automation_clip": 5,
-        }
-        _write_event(f, "FLP_ChanType", CHANNEL_TYPE_MAP[channel.type])
-
-        _write_event(f, "FLP_Text_PluginName", channel.misc["FLP_Text_PluginName"])
-        _write_event(f, "FLP_NewPlugin", channel.misc["FLP_NewPlugin"])
-
-        _write_event(f, "ChannelName", _str_to_UTF16(channel.name))
-
-        for miscKey in [
-            "UNKNOWN_155",
-            "FLP_Color",
-            "FLP_PluginParams",
-            "FLP_Enabled",
-            "FLP_Delay",
-            "FLP_Reverb",
-            "FLP_IntStretch",
-            "FLP_ShiftDelay",
-            "UNKNOWN_97",
-            "FLP_FX",
-            "FLP_FX3",
-            "FLP_CutOff",
-            "FLP_Resonance",
-            "FLP_PreAmp",
-            "FLP_Decay",
-            "FLP_Attack",
-            "FLP_StDel",
-            "FLP_FXSine",
-            "FLP_Fade_Stereo",
-            "FLP_MixSliceNum",
-            "ChannelParams",
-            "UNKNOWN_229",
-            "UNKNOWN_221",
-            "FLP_ChanParams",
-            "FLP_CutCutBy",
-            "UNKNOWN_144",
-            "ChannelFilterGroup",
-            "UNKNOWN_234",
-            "UNKNOWN_32",
-            "UNKNOWN_228",
-            "FLP_SSNote",
-            "ChannelEnvelopeParams",
-            "UNKNOWN_143",
-            "FLP_LoopType",
-            "FLP_Text_SampleFileName",
-            "UNKNOWN_142",
-            "UNKNOWN_150",
-            "UNKNOWN_157",
-            "UNKNOWN_158",
-            "UNKNOWN_164",
-        ]:
-            if miscKey in channel.misc:
-                if isinstance(channel.misc[miscKey], list):
-                    for data in channel.misc[miscKey]:
-                        _write_event(f, miscKey, data)
-                else:
-                    _write_event(f, miscKey, channel.misc[miscKey])
+        _write_event(buf, CHAN_TYPE_EID, CHANNEL_TYPE_MAP[channel.type])
+
+        _write_event(buf, PLUGIN_NAME_EID, channel.misc["FLP_Text_PluginName"])
+        _write_event(buf, NEW_PLUGIN_EID, channel.misc["FLP_NewPlugin"])
+
+        _write_event(buf, CHANNEL_NAME_EID, _str_to_UTF16(channel.name))
+
+        for eventId, miscKey in CHANNEL_MISC_EVENTS:
+            data = channel.misc.get(miscKey)
+            if data is None:
+                continue
+            if isinstance(data, list):
+                for listData in data:
+                    _write_event(buf, eventId, listData)
+            else:
+                _write_event(buf, eventId, data)
 
         pass
 
     # write arrangement data
     for i, arrangement in enumerate(project.arrangements):
-        _write_event(f, 99, i)
+        _write_event(buf, 99, i)
         if arrangement.name:
-            _write_event(f, "ArrangementName", _str_to_UTF16(arrangement.name))
-        _write_event(f, "UNKNOWN_36", arrangement.misc["UNKNOWN_36"])
+            _write_event(buf, ARRANGEMENT_NAME_EID, _str_to_UTF16(arrangement.name))
+        _write_event(buf, UNKNOWN_36_EID, arrangement.misc["UNKNOWN_36"])
 
         arrangement_data = _make_arrangement_data(arrangement)
-        _write_event(f, 233, arrangement_data)
+        _write_event(buf, 233, arrangement_data)
         for track in arrangement.tracks:
-            _write_event(f, "TrackInfo", track.misc["TrackInfo"])
+            _write_event(buf, TRACK_INFO_EID, track.misc["TrackInfo"])
             if track.name:
-                _write_event(f, "TrackName", _str_to_UTF16(track.name))
+                _write_event(buf, TRACK_NAME_EID, _str_to_UTF16(track.name))
 
     # more globals, see grammar
-    for eventId in [100, 29, 39, 40, 31, 38]:
-        writeGenericProjectEvent(eventId)
+    for eventId, name in PROJECT_EVENTS_MIDDLE:
+        _write_event(buf, eventId, projectInfo[name])
 
     # write mixer data
+    # (pre-encoded SlotIndex events skip _write_event, so only use them when
+    # it isn't the debug variant, which has to log every event)
+    preEncodedSlots = _write_event is _write_event_fast
     for mixerTrack in project.mixerTracks:
-        _write_event(f, "MixerTrackInfo", mixerTrack.misc["MixerTrackInfo"])
+        _write_event(buf, MIXER_TRACK_INFO_EID, mixerTrack.misc["MixerTrackInfo"])
         # write mixer effect slots
-        for i in range(10):
-            # if i != 0:
-            _write_event(f, "SlotIndex", i)
-            if i in mixerTrack.effects:
-                effect = mixerTrack.effects[i]
-                for miscKey in [
-                    "FLP_Text_PluginName",
-                    "FLP_NewPlugin",
-                ]:
-                    if miscKey in effect.misc:
-                        _write_event(f, miscKey, effect.misc[miscKey])
-                if effect.name:
-                    _write_event(f, "ChannelName", _str_to_UTF16(effect.name))
-                for miscKey in [
-                    "UNKNOWN_155",
-                    "FLP_Color",
-                    "FLP_PluginParams",
-                ]:
-                    if miscKey in effect.misc:
-                        _write_event(f, miscKey, effect.misc[miscKey])
-            # if i == 0:
-            #     _write_event(f, "SlotIndex", i)  # lol
+        effects = mixerTrack.effects
+        if not effects and preEncodedSlots:
+            buf.extend(EMPTY_MIXER_SLOTS)
+        else:
+            for i in range(10):
+                # if i != 0:
+                if preEncodedSlots:
+                    buf.extend(SLOT_INDEX_EVENTS[i])
+                else:
+                    _write_event(buf, SLOT_INDEX_EID, i)
+                effect = effects.get(i)
+                if effect is not None:
+                    for eventId, miscKey in MIXER_EFFECT_PRE_EVENTS:
+                        data = effect.misc.get(miscKey)
+                        if data is not None:
+                            _write_event(buf, eventId, data)
+                    if effect.name:
+                        _write_event(buf, CHANNEL_NAME_EID, _str_to_UTF16(effect.name))
+                    for eventId, miscKey in MIXER_EFFECT_POST_EVENTS:
+                        data = effect.misc.get(miscKey)
+                        if data is not None:
+                            _write_event(buf, eventId, data)
+                # if i == 0:
+                #     _write_event(buf, "SlotIndex", i)  # lol
         # mixer track postamble
-        for miscKey in [
-            "MixerTrackRouting",
-            "InsertAudioInputSource",
-            "InsertAudioOutputTarget",
-            "MixerTrackColor",
-            "MixerTrackIcon",
-        ]:
-            if miscKey in mixerTrack.misc:
-                _write_event(f, miscKey, mixerTrack.misc[miscKey])
+        for eventId, miscKey in MIXER_TRACK_MISC_EVENTS:
+            data = mixerTrack.misc.get(miscKey)
+            if data is not None:
+                _write_event(buf, eventId, data)
         if mixerTrack.name:
-            _write_event(f, "InsertName", _str_to_UTF16(mixerTrack.name))
+            _write_event(buf, INSERT_NAME_EID, _str_to_UTF16(mixerTrack.name))
 
     # more globals, see grammar
-    writeGenericProjectEvent(225)  # this is massive...
-    writeGenericProjectEvent(133)
-
-    # write back to the datalength
-    endingPosition = f.tell()
-    dataLength = (
-        endingPosition - dataLengthPosition - 4
-    )  # -4 because of the empty space we made for the size!
+    for eventId, name in PROJECT_EVENTS_END:
+        _write_event(buf, eventId, projectInfo[name])
+
+    dataLength = len(buf) - dataStart
     print("{} bytes of event data".format(dataLength))
-    f.seek(dataLengthPosition, 0)
-    f.write(itob(dataLength, 4))
+    DWORD_STRUCT.pack_into(buf, len(HEADER_PREFIX), dataLength)
+
+    with open(filepath, "wb") as f:
+        f.write(buf)
 
 
 # _event_size_to_bytes test
@@ -308,16 +408,21 @@ def write_FLP(filepath: str, project: Project) -> None:
 def test_event_size_to_bytes():
     from flp_read import _read_TEXT_event_size
     import random
-    from io import BytesIO
 
-    for i in range(0, 100):
-        size = random.randint(0, 2**128)
+    # edge cases (an empty payload still needs its size byte), then random sizes
+    sizes = [0, 127, 128, 16383, 16384]
+    sizes += [random.randint(0, 2**128) for i in range(0, 100)]
+    for size in sizes:
         sizeBytes = _event_size_to_bytes(size)
-        f = BytesIO(sizeBytes)
-        parsed = _read_TEXT_event_size(f)
+        parsed, _ = _read_TEXT_event_size(sizeBytes, 0)
         assert size == parsed, (
             "_event_size_to_bytes test failed: " f"{size} {parsed} {sizeBytes}"
         )
+    assert _event_size_to_bytes(0) == b"\x00"
+    assert _event_size_to_bytes(127) == b"\x7f"
+    assert _event_size_to_bytes(128) == b"\x80\x01"
+    assert _event_size_to_bytes(16383) == b"\xff\x7f"
+    assert _event_size_to_bytes(16384) == b"\x80\x80\x01"
 
 
 if __name__ == "__main__":
@@ -325,8 +430,7 @@ if __name__ == "__main__":
 
     from flp_read import load_FLP
 
-    DEBUG = 1
-    fd = open("test_comment_OUT_DEBUG.txt", "w")
+    enable_debug(open("test_comment_OUT_DEBUG.txt", "w"))
 
     print("loading...")
     project = load_FLP("test/files/test_comment.flp")